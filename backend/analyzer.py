@@ -1,8 +1,13 @@
 import json
-import re
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
-from .bedrock_client import converse_json, converse_agentic, invoke_agent_text
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional C extension
+    ahocorasick = None
+
+from .bedrock_client import converse_agentic, converse_json_stream, invoke_agent_text, iter_agent_text
+from .policy_norms import policy_bullets
 
 
 SCHEMA_GUIDE = {
@@ -20,34 +25,75 @@ SCHEMA_GUIDE = {
     ],
     "summary": "1-2 sentence summary",
 }
+_SCHEMA_JSON = json.dumps(SCHEMA_GUIDE, ensure_ascii=False)
+
+
+MAX_PROMPT_CHARS = 200000
+_PAGE_HEADERS = tuple(f"[Page {i + 1}]\n" for i in range(64))
+
+
+def _combine_pages(pages: List[str], limit: int = MAX_PROMPT_CHARS) -> str:
+    """Join pages as "[Page n]" sections, never building more than `limit` chars."""
+    parts = []
+    remaining = limit
+    for i, t in enumerate(pages):
+        header = _PAGE_HEADERS[i] if i < len(_PAGE_HEADERS) else f"[Page {i + 1}]\n"
+        piece_parts = ("\n\n" if parts else "", header, t or "")
+        for piece in piece_parts:
+            if len(piece) >= remaining:
+                parts.append(piece[:remaining])
+                return "".join(parts)
+            parts.append(piece)
+            remaining -= len(piece)
+    return "".join(parts)
+
+
+_ANALYSIS_INSTRUCTIONS = (
+    "You are a contracts attorney specializing in Indian contract law. "
+    "Analyze the following contract text and identify risky clauses and concerns. "
+    "Return STRICT JSON only, matching the JSON schema. Do not include markdown. "
+    "Use exact clause quotes in 'exact_text_snippet' for frontend highlighting. "
+    "Keep recommendations pragmatic and concise; include redline_suggestion when applicable. "
+    "If multiple similar issues exist, group them logically."
+)
+# Static prompt prefix; sent as the system prompt where it can carry a cache point.
+_ANALYSIS_SYSTEM = (
+    f"{_ANALYSIS_INSTRUCTIONS}\n\n"
+    f"JSON schema (structure example, not literal):\n{_SCHEMA_JSON}"
+)
 
 
 def build_prompt(full_text: str) -> str:
-    instructions = (
-        "You are a contracts attorney specializing in Indian contract law. "
-        "Analyze the following contract text and identify risky clauses and concerns. "
-        "Return STRICT JSON only, matching the JSON schema. Do not include markdown. "
-        "Use exact clause quotes in 'exact_text_snippet' for frontend highlighting. "
-        "Keep recommendations pragmatic and concise; include redline_suggestion when applicable. "
-        "If multiple similar issues exist, group them logically."
-    )
-    schema = json.dumps(SCHEMA_GUIDE, ensure_ascii=False)
-    prompt = (
-        f"{instructions}\n\n"
-        f"JSON schema (structure example, not literal):\n{schema}\n\n"
-        f"Contract:\n" + full_text[:200000]
-    )
-    return prompt
+    return f"{_ANALYSIS_SYSTEM}\n\nContract:\n" + full_text
 
 
-def parse_llm_json(text: str) -> Dict:
-    s = text.strip()
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _decode_llm_json(s: str):
+    # Fast path: the prompt asks for STRICT JSON, so most replies parse as-is.
+    try:
+        return json.loads(s)
+    except json.JSONDecodeError:
+        pass
     start = s.find("{")
+    if start == -1:
+        raise ValueError("no JSON object in model output")
+    try:
+        # Stops at the end of the first object without scanning trailing chatter.
+        return _JSON_DECODER.raw_decode(s, start)[0]
+    except json.JSONDecodeError:
+        pass
     end = s.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        s = s[start : end + 1]
+    if end <= start:
+        raise ValueError("no JSON object in model output")
+    return json.loads(s[start : end + 1])
+
+
+def parse_llm_json(text: str) -> Dict:
+    s = text.strip()
     try:
-        data = json.loads(s)
+        data = _decode_llm_json(s)
         if "issues" not in data:
             data = {"issues": data if isinstance(data, list) else [], "summary": ""}
         return data
@@ -56,23 +102,78 @@ def parse_llm_json(text: str) -> Dict:
 
 
 def normalize_ws(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "").strip())
+    return " ".join((s or "").split())
+
 
+# Normalized snippets shorter than this match noisily across pages; they get no page hits.
+MIN_SNIPPET_CHARS = 8
 
-def locate_snippet_pages(pages: List[str], snippet: str) -> List[int]:
+
+def locate_snippet_pages(norm_pages: List[str], snippet: str) -> List[int]:
+    # norm_pages must already be passed through normalize_ws (once per request).
     if not snippet:
         return []
     sn = normalize_ws(snippet)
+    if len(sn) < MIN_SNIPPET_CHARS:
+        return []
+    sn_len = len(sn)
     hits = []
-    for i, page_text in enumerate(pages, start=1):
-        pt = normalize_ws(page_text)
-        if sn and sn in pt:
+    for i, pt in enumerate(norm_pages, start=1):
+        if sn_len > len(pt):
+            continue
+        if sn in pt:
             hits.append(i)
     return hits
 
 
+def build_snippet_index(snippets: List[Optional[str]]):
+    """Build one Aho-Corasick automaton over all issue snippets.
+
+    Keys are normalized snippets; values are the list of snippet indices sharing
+    that text. Returns None when pyahocorasick is unavailable or nothing to index.
+    """
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for idx, snippet in enumerate(snippets):
+        if not isinstance(snippet, str):
+            continue
+        sn = normalize_ws(snippet)
+        if len(sn) < MIN_SNIPPET_CHARS:
+            continue
+        if sn in automaton:
+            automaton.get(sn).append(idx)
+        else:
+            automaton.add_word(sn, [idx])
+    if len(automaton) == 0:
+        return None
+    automaton.make_automaton()
+    return automaton
+
+
+def locate_snippets(norm_pages: List[str], snippets: List[Optional[str]]) -> Dict[int, List[int]]:
+    """Map snippet index -> 1-based page numbers, scanning each page once."""
+    automaton = build_snippet_index(snippets)
+    if automaton is None:
+        return {
+            idx: locate_snippet_pages(norm_pages, snippet)
+            for idx, snippet in enumerate(snippets)
+            if isinstance(snippet, str) and snippet
+        }
+    hits: Dict[int, List[int]] = {}
+    for page_num, pt in enumerate(norm_pages, start=1):
+        for _, indices in automaton.iter(pt):
+            for idx in indices:
+                pages_for = hits.setdefault(idx, [])
+                if not pages_for or pages_for[-1] != page_num:
+                    pages_for.append(page_num)
+    return hits
+
+
 def analyze_with_bedrock(model_id: str, pages: List[str]) -> Dict:
-    combined = "\n\n".join([f"[Page {i+1}]\n{t}" for i, t in enumerate(pages)])
+    # One request covers the whole document (cross-clause context matters), so there is
+    # no per-page fan-out to parallelize; latency is bounded by this single agentic call.
+    combined = _combine_pages(pages)
     prompt = build_prompt(combined)
 
     tools = [
@@ -98,53 +199,7 @@ def analyze_with_bedrock(model_id: str, pages: List[str]) -> Dict:
         if name != "policy_library":
             return "Unknown tool"
         category = (inp or {}).get("category", "general").lower()
-        norms = {
-            "confidentiality": [
-                "Exclude information already known/independently developed/public domain.",
-                "Add mutual obligations if both parties share information.",
-                "Limit onward disclosure to need-to-know + written obligations.",
-                "Add prompt notice for compelled disclosures.",
-            ],
-            "indemnity": [
-                "Cap indemnity to fees or a defined INR cap.",
-                "Exclude indirect/special/consequential/punitive damages.",
-                "Define notice, control of defense, and mitigation.",
-            ],
-            "liability": [
-                "Cap total liability; carve-out only wilful misconduct/gross negligence.",
-                "Exclude indirect/special/consequential damages; limit to direct losses.",
-            ],
-            "termination": [
-                "Allow convenience termination with notice (e.g., 30 days).",
-                "Shorter auto-renew cycles or explicit opt-in renewals.",
-            ],
-            "jurisdiction": [
-                "Prefer Indian law and venue convenient to both parties.",
-                "Consider arbitration (Arbitration and Conciliation Act, 1996).",
-            ],
-            "payment": [
-                "Define clear payment terms, GST handling, and late fees.",
-                "Set-off rights and dispute procedures.",
-            ],
-            "ip": [
-                "Clarify ownership, license scope, and residuals.",
-                "Avoid implied assignment; require written assignment if needed.",
-            ],
-            "dispute-resolution": [
-                "Escalation ladder; mediation; arbitration venue and seat in India.",
-                "Costs and language provisions.",
-            ],
-            "non-compete": [
-                "Ensure reasonable scope/duration; tie to protection of legitimate interests.",
-                "Avoid restraints that may be void under Section 27 (restraint of trade).",
-            ],
-            "general": [
-                "Ensure compliance with applicable Indian data protection requirements.",
-                "Add confidentiality survival term; return/destroy obligations.",
-            ],
-        }
-        tips = norms.get(category, norms["general"])
-        return "Policy library (India) for category='{}':\n- " .format(category) + "\n- ".join(tips)
+        return "Policy library (India) for category='{}':\n".format(category) + policy_bullets(category)
 
     tool_instruction = (
         "You have access to a tool named policy_library(category, jurisdiction='India'). "
@@ -157,19 +212,31 @@ def analyze_with_bedrock(model_id: str, pages: List[str]) -> Dict:
     return data
 
 
-def analyze_with_bedrock_agent(agent_id: str, agent_alias_id: str, pages: List[str]) -> Dict:
-    combined = "\n\n".join([f"[Page {i+1}]\n{t}" for i, t in enumerate(pages)])
+def stream_analysis(model_id: str, pages: List[str]) -> Iterator[str]:
+    """Stream the raw JSON analysis text (no tool use) as the model generates it."""
+    return converse_json_stream(model_id, "Contract:\n" + _combine_pages(pages), system=_ANALYSIS_SYSTEM)
+
+
+def _agent_user_text(pages: List[str]) -> str:
+    combined = _combine_pages(pages)
     base_instructions = (
         "You are a contracts attorney specializing in Indian contract law. "
         "Use available tools (policy_library, severity_rules, redline_templates) to ground your analysis. "
         "Return STRICT JSON only, matching the schema with fields: issues[], summary. "
         "Use exact_text_snippet for precise highlighting and keep recommendations pragmatic."
     )
-    schema = json.dumps(SCHEMA_GUIDE, ensure_ascii=False)
-    user_text = (
+    return (
         f"{base_instructions}\n\n"
-        f"JSON schema (structure example, not literal):\n{schema}\n\n"
-        f"Contract:\n{combined[:200000]}"
+        f"JSON schema (structure example, not literal):\n{_SCHEMA_JSON}\n\n"
+        f"Contract:\n{combined}"
     )
-    raw = invoke_agent_text(agent_id, agent_alias_id, user_text)
+
+
+def stream_analysis_with_agent(agent_id: str, agent_alias_id: str, pages: List[str]) -> Iterator[str]:
+    """Stream the Bedrock Agent's raw JSON analysis text as chunks arrive."""
+    return iter_agent_text(agent_id, agent_alias_id, _agent_user_text(pages))
+
+
+def analyze_with_bedrock_agent(agent_id: str, agent_alias_id: str, pages: List[str]) -> Dict:
+    raw = invoke_agent_text(agent_id, agent_alias_id, _agent_user_text(pages))
     return parse_llm_json(raw)
@@ -1,18 +1,28 @@
+import asyncio
+import io
 import json
 import os
-import tempfile
 import time
 import uuid
-from typing import Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import boto3
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from mangum import Mangum
 
-from .models import PresignRequest, PresignResponse, AnalyzeRequest, AnalyzeResult, HealthResponse, Issue
+from .models import PresignRequest, PresignResponse, AnalyzeRequest, AnalyzeResult, HealthResponse, Issue, SEVERITIES
 from .parsers import detect_type_from_key, parse_pdf, parse_docx
-from .analyzer import analyze_with_bedrock, analyze_with_bedrock_agent, locate_snippet_pages
+from .bedrock_client import get_bedrock_agent_runtime, get_bedrock_runtime
+from .analyzer import (
+    analyze_with_bedrock,
+    analyze_with_bedrock_agent,
+    locate_snippets,
+    normalize_ws,
+    stream_analysis,
+    stream_analysis_with_agent,
+)
 
 
 REGION = os.environ.get("AWS_REGION") or os.environ.get("AWS_DEFAULT_REGION") or "us-east-1"
@@ -26,7 +36,11 @@ AGENT_ALIAS_ID = os.environ.get("BEDROCK_AGENT_ALIAS_ID", "")
 
 _s3 = boto3.client("s3", region_name=REGION)
 
-app = FastAPI(title="Auto Redliner (India)")
+# Parsed pages keyed by (s3_key, ETag); oldest entry is evicted first.
+PAGES_CACHE_SIZE = int(os.environ.get("PAGES_CACHE_SIZE", "64"))
+_PAGES_CACHE: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+
+app = FastAPI(title="Auto Redliner (India)", default_response_class=ORJSONResponse)
 
 allowed_origins = os.environ.get("ALLOWED_ORIGINS", "*")
 app.add_middleware(
@@ -38,6 +52,20 @@ app.add_middleware(
 )
 
 
+def _optional_int(value) -> Optional[int]:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else None
+
+
+def _optional_str(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
 @app.get("/health", response_model=HealthResponse)
 def health():
     return HealthResponse(
@@ -72,8 +100,7 @@ def create_upload_url(req: PresignRequest):
     return PresignResponse(key=key, url=url, headers=headers, content_type=content_type)
 
 
-@app.post("/analyze", response_model=AnalyzeResult)
-def analyze(req: AnalyzeRequest):
+async def _load_pages(req: AnalyzeRequest) -> List[str]:
     if not UPLOADS_BUCKET:
         raise HTTPException(status_code=500, detail="UPLOADS_BUCKET not configured")
     if not req.s3_key:
@@ -81,58 +108,111 @@ def analyze(req: AnalyzeRequest):
 
     ftype = detect_type_from_key(req.s3_key)
 
-    with tempfile.TemporaryDirectory() as td:
-        local_path = os.path.join(td, os.path.basename(req.s3_key))
-        try:
-            _s3.download_file(UPLOADS_BUCKET, req.s3_key, local_path)
-        except Exception as e:
-            raise HTTPException(status_code=404, detail=f"File not found: {e}")
-
-        size_mb = os.path.getsize(local_path) / (1024 * 1024)
-        if size_mb > MAX_FILE_MB:
-            raise HTTPException(status_code=400, detail=f"File too large: {size_mb:.1f} MB > {MAX_FILE_MB} MB")
-
-        if ftype == "pdf":
-            pages, total = parse_pdf(local_path, max_pages=MAX_PAGES)
-        elif ftype == "docx":
-            pages, total = parse_docx(local_path, max_pages=MAX_PAGES)
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type")
+    try:
+        obj = await asyncio.to_thread(_s3.get_object, Bucket=UPLOADS_BUCKET, Key=req.s3_key)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"File not found: {e}")
+
+    # Small uploads: read straight into memory instead of the threaded transfer manager.
+    size_mb = obj.get("ContentLength", 0) / (1024 * 1024)
+    if size_mb > MAX_FILE_MB:
+        obj["Body"].close()
+        raise HTTPException(status_code=400, detail=f"File too large: {size_mb:.1f} MB > {MAX_FILE_MB} MB")
+
+    # Re-analyses of an unchanged object reuse its parsed pages; a new ETag misses the cache.
+    cache_key = (req.s3_key, obj.get("ETag", ""))
+    cached = _PAGES_CACHE.get(cache_key) if cache_key[1] else None
+    if cached is not None:
+        obj["Body"].close()
+        return list(cached)
+    source = io.BytesIO(await asyncio.to_thread(obj["Body"].read))
+
+    if ftype == "pdf":
+        pages, total = await asyncio.to_thread(parse_pdf, source, max_pages=MAX_PAGES)
+    elif ftype == "docx":
+        pages, total = await asyncio.to_thread(parse_docx, source, max_pages=MAX_PAGES)
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
 
     if not any(pages):
         raise HTTPException(status_code=400, detail="No extractable text found in document")
+    if cache_key[1] and PAGES_CACHE_SIZE > 0:
+        while _PAGES_CACHE and len(_PAGES_CACHE) >= PAGES_CACHE_SIZE:
+            _PAGES_CACHE.pop(next(iter(_PAGES_CACHE)))
+        _PAGES_CACHE[cache_key] = tuple(pages)
+    return pages
+
+
+def _sse(chunks: Iterator[str]) -> Iterator[str]:
+    for chunk in chunks:
+        yield "".join(f"data: {line}\n" for line in chunk.split("\n")) + "\n"
+
 
+@app.post("/analyze/stream")
+async def analyze_stream(req: AnalyzeRequest):
+    pages = await _load_pages(req)
     if USE_BEDROCK_AGENT and AGENT_ID and AGENT_ALIAS_ID:
-        data = analyze_with_bedrock_agent(AGENT_ID, AGENT_ALIAS_ID, pages)
+        chunks = stream_analysis_with_agent(AGENT_ID, AGENT_ALIAS_ID, pages)
     else:
-        data = analyze_with_bedrock(MODEL_ID, pages)
+        chunks = stream_analysis(MODEL_ID, pages)
+    return StreamingResponse(_sse(chunks), media_type="text/event-stream")
+
+
+@app.post("/analyze", response_model=AnalyzeResult)
+async def analyze(req: AnalyzeRequest):
+    pages = await _load_pages(req)
+
+    if USE_BEDROCK_AGENT and AGENT_ID and AGENT_ALIAS_ID:
+        llm_call = asyncio.to_thread(analyze_with_bedrock_agent, AGENT_ID, AGENT_ALIAS_ID, pages)
+    else:
+        llm_call = asyncio.to_thread(analyze_with_bedrock, MODEL_ID, pages)
+    # Normalize pages for snippet lookup while the Bedrock call is in flight.
+    data, norm_pages = await asyncio.gather(
+        llm_call,
+        asyncio.to_thread(lambda: [normalize_ws(p) for p in pages]),
+    )
+
+    raw_issues = data.get("issues", [])
+    snippets = [r.get("exact_text_snippet") if isinstance(r, dict) else None for r in raw_issues]
+    snippet_pages = locate_snippets(norm_pages, snippets)
 
     issues_payload = []
-    for idx, raw_issue in enumerate(data.get("issues", []), start=1):
-        try:
-            snippet = raw_issue.get("exact_text_snippet")
-            page_nums = locate_snippet_pages(pages, snippet) if snippet else []
-            issue = Issue(
-                issue_id=str(raw_issue.get("issue_id") or f"i{idx}"),
-                category=str(raw_issue.get("category") or "general"),
-                severity=str(raw_issue.get("severity") or "medium").lower(),
-                risk_summary=str(raw_issue.get("risk_summary") or ""),
-                recommendation=str(raw_issue.get("recommendation") or ""),
-                exact_text_snippet=snippet,
-                page_hint=raw_issue.get("page_hint"),
-                page_numbers=page_nums,
-                redline_suggestion=raw_issue.get("redline_suggestion"),
-            )
-            issues_payload.append(issue)
-        except Exception:
+    for idx, raw_issue in enumerate(raw_issues, start=1):
+        if not isinstance(raw_issue, dict):
+            continue
+        severity = str(raw_issue.get("severity") or "medium").lower()
+        if severity not in SEVERITIES:
             continue
+        snippet = snippets[idx - 1] or None
+        # Fields are coerced to their declared types here, so skip re-validation.
+        issue = Issue.model_construct(
+            issue_id=str(raw_issue.get("issue_id") or f"i{idx}"),
+            category=str(raw_issue.get("category") or "general"),
+            severity=severity,
+            risk_summary=str(raw_issue.get("risk_summary") or ""),
+            recommendation=str(raw_issue.get("recommendation") or ""),
+            exact_text_snippet=snippet if isinstance(snippet, str) else None,
+            page_hint=_optional_int(raw_issue.get("page_hint")),
+            page_numbers=snippet_pages.get(idx - 1, []) if snippet else [],
+            redline_suggestion=_optional_str(raw_issue.get("redline_suggestion")),
+        )
+        issues_payload.append(issue)
 
     result = AnalyzeResult(
         issues=issues_payload,
         summary=str(data.get("summary") or ""),
         total_issues=len(issues_payload),
     )
-    return result
+    # Issues are already coerced to schema types; skip FastAPI's generic encoder pass.
+    return ORJSONResponse(result.model_dump())
 
 
 handler = Mangum(app)
+
+# Build Bedrock clients during Lambda init so the first /analyze does not pay for it.
+# Parsers, compiled patterns and the schema JSON are already loaded at import time.
+if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+    if USE_BEDROCK_AGENT and AGENT_ID and AGENT_ALIAS_ID:
+        get_bedrock_agent_runtime(REGION)
+    else:
+        get_bedrock_runtime(REGION)
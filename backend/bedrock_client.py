@@ -1,37 +1,106 @@
+import codecs
+import functools
+import io
 import json
 import os
-import uuid
-from typing import Any, Dict, Optional
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional
 
 import boto3
+import orjson
+from botocore.config import Config
+
+
+# Shared by every Bedrock client: pooled keep-alive connections and adaptive retries for throttling.
+_CLIENT_CONFIG = Config(
+    max_pool_connections=50,
+    retries={"mode": "adaptive", "max_attempts": 5},
+    connect_timeout=3,
+    read_timeout=60,
+)
+
+
+def _resolve_region(region: Optional[str] = None) -> str:
+    return region or os.environ.get("AWS_REGION") or os.environ.get("AWS_DEFAULT_REGION") or "us-east-1"
+
+
+# Prompt caching is only supported by some Claude/Nova models, so it is opt-in.
+PROMPT_CACHE = (os.environ.get("BEDROCK_PROMPT_CACHE", "0").strip().lower() in {"1", "true", "yes"})
+_CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+
+def _system_blocks(system: Optional[str]) -> Dict[str, Any]:
+    if not system:
+        return {}
+    blocks = [{"text": system}]
+    if PROMPT_CACHE:
+        blocks.append(_CACHE_POINT)
+    return {"system": blocks}
+
+
+# boto3 clients are thread-safe and expensive to build; reuse them across warm invocations.
+@functools.lru_cache(maxsize=4)
+def _cached_client(service: str, region: str):
+    return boto3.client(service, region_name=region, config=_CLIENT_CONFIG)
 
 
 def get_bedrock_runtime(region: str = None):
-    region = region or os.environ.get("AWS_REGION") or os.environ.get("AWS_DEFAULT_REGION") or "us-east-1"
-    return boto3.client("bedrock-runtime", region_name=region)
+    return _cached_client("bedrock-runtime", _resolve_region(region))
 
 
 def get_bedrock_agent_runtime(region: str = None):
-    region = region or os.environ.get("AWS_REGION") or os.environ.get("AWS_DEFAULT_REGION") or "us-east-1"
-    return boto3.client("bedrock-agent-runtime", region_name=region)
+    return _cached_client("bedrock-agent-runtime", _resolve_region(region))
+
+
+@functools.lru_cache(maxsize=8)
+def _inference_config(max_tokens: int, temperature: float) -> Dict[str, Any]:
+    # Shared per (max_tokens, temperature) combo; botocore only reads request params.
+    return {
+        "maxTokens": max_tokens,
+        "temperature": temperature,
+        "topP": 0.9,
+    }
 
 
-def converse_json(model_id: str, prompt: str, max_tokens: int = 2500, temperature: float = 0.2) -> str:
+def converse_json_stream(
+    model_id: str,
+    prompt: str,
+    max_tokens: int = 2500,
+    temperature: float = 0.2,
+    system: Optional[str] = None,
+) -> Iterator[str]:
+    """Yield text deltas from ConverseStream as the model generates them."""
+    client = get_bedrock_runtime()
+    resp = client.converse_stream(
+        modelId=model_id,
+        messages=[{"role": "user", "content": [{"text": prompt}]}],
+        inferenceConfig=_inference_config(max_tokens, temperature),
+        **_system_blocks(system),
+    )
+    for event in resp["stream"]:
+        delta = event.get("contentBlockDelta")
+        if delta is not None:
+            text = delta["delta"].get("text")
+            if text:
+                yield text
+        elif "messageStop" in event:
+            break
+
+
+def converse_json(
+    model_id: str,
+    prompt: str,
+    max_tokens: int = 2500,
+    temperature: float = 0.2,
+    system: Optional[str] = None,
+) -> str:
     client = get_bedrock_runtime()
     try:
-        resp = client.converse(
-            modelId=model_id,
-            messages=[{"role": "user", "content": [{"text": prompt}]}],
-            inferenceConfig={
-                "maxTokens": max_tokens,
-                "temperature": temperature,
-                "topP": 0.9,
-            },
-        )
-        return resp["output"]["message"]["content"][0]["text"]
+        return "".join(converse_json_stream(model_id, prompt, max_tokens, temperature, system))
     except client.exceptions.ValidationException:
-        body = json.dumps({
-            "inputText": prompt,
+        body = orjson.dumps({
+            "inputText": f"{system}\n\n{prompt}" if system else prompt,
             "textGenerationConfig": {
                 "maxTokenCount": max_tokens,
                 "temperature": temperature,
@@ -39,10 +108,24 @@ def converse_json(model_id: str, prompt: str, max_tokens: int = 2500, temperatur
             }
         })
         resp = client.invoke_model(modelId=model_id, body=body)
-        payload = json.loads(resp.get("body").read()) if hasattr(resp.get("body"), "read") else json.loads(resp.get("body"))
+        payload = orjson.loads(resp.get("body").read()) if hasattr(resp.get("body"), "read") else orjson.loads(resp.get("body"))
         return payload.get("results", [{}])[0].get("outputText") or payload.get("generated_text") or json.dumps(payload)
 
 
+def _run_tool(tu: Dict[str, Any], tool_runner) -> Dict[str, Any]:
+    name = tu.get("name")
+    try:
+        result_text = tool_runner(name, tu.get("input", {}))
+    except Exception as e:
+        result_text = f"Tool {name} failed: {e}"
+    return {
+        "toolResult": {
+            "toolUseId": tu.get("toolUseId"),
+            "content": [{"text": result_text}],
+        }
+    }
+
+
 def converse_agentic(
     model_id: str,
     user_text: str,
@@ -53,8 +136,15 @@ def converse_agentic(
     max_rounds: int = 3,
 ) -> str:
     client = get_bedrock_runtime()
-    messages = [{"role": "user", "content": [{"text": user_text}]}]
+    user_content = [{"text": user_text}]
     tool_config = {"tools": tools}
+    if PROMPT_CACHE:
+        # Every round resends the tool specs and the contract; cache both prefixes.
+        user_content.append(_CACHE_POINT)
+        tool_config = {"tools": list(tools) + [_CACHE_POINT]}
+    messages = [{"role": "user", "content": user_content}]
+
+    inference_config = _inference_config(max_tokens, temperature)
 
     last_resp = None
     for _ in range(max_rounds):
@@ -62,54 +152,43 @@ def converse_agentic(
             modelId=model_id,
             messages=messages,
             toolConfig=tool_config,
-            inferenceConfig={
-                "maxTokens": max_tokens,
-                "temperature": temperature,
-                "topP": 0.9,
-            },
+            inferenceConfig=inference_config,
         )
         last_resp = resp
         assistant_message = resp["output"]["message"]
         content = assistant_message.get("content", [])
-
-        messages.append({"role": "assistant", "content": content})
         texts = [c.get("text") for c in content if "text" in c and c.get("text")]
         tool_uses = [c.get("toolUse") for c in content if "toolUse" in c and c.get("toolUse")]
 
-        if tool_uses:
-            result_contents = []
-            for tu in tool_uses:
-                name = tu.get("name")
-                input_json = tu.get("input", {})
-                tool_use_id = tu.get("toolUseId")
-                try:
-                    result_text = tool_runner(name, input_json)
-                except Exception as e:
-                    result_text = f"Tool {name} failed: {e}"
-                result_contents.append({
-                    "toolResult": {
-                        "toolUseId": tool_use_id,
-                        "content": [{"text": result_text}],
-                    }
-                })
-            messages.append({"role": "user", "content": result_contents})
-            continue
-
-        if texts:
-            return "\n".join(texts)
+        # Only another round when the model asked for tools; end_turn/max_tokens are final.
+        stop_reason = resp.get("stopReason")
+        wants_tools = stop_reason == "tool_use" if stop_reason else bool(tool_uses)
+        if not (wants_tools and tool_uses):
+            if texts:
+                return "\n".join(texts)
+            break
+
+        messages.append({"role": "assistant", "content": content})
+        if len(tool_uses) == 1:
+            result_contents = [_run_tool(tool_uses[0], tool_runner)]
+        else:
+            # Independent tool calls from one turn run concurrently; map() keeps their order.
+            with ThreadPoolExecutor(max_workers=len(tool_uses)) as ex:
+                result_contents = list(ex.map(lambda tu: _run_tool(tu, tool_runner), tool_uses))
+        messages.append({"role": "user", "content": result_contents})
     return json.dumps((last_resp or {}).get("output", {}))
 
 
-def invoke_agent_text(
+def iter_agent_text(
     agent_id: str,
     agent_alias_id: str,
     input_text: str,
     session_id: Optional[str] = None,
     region: Optional[str] = None,
-) -> str:
-
+) -> Iterator[str]:
+    """Yield the agent's answer text as each completion chunk arrives."""
     client = get_bedrock_agent_runtime(region)
-    sid = session_id or uuid.uuid4().hex
+    sid = session_id or secrets.token_hex(16)
     resp = client.invoke_agent(
         agentId=agent_id,
         agentAliasId=agent_alias_id,
@@ -117,30 +196,50 @@ def invoke_agent_text(
         inputText=input_text,
     )
 
-    out = []
+    # Incremental decoding keeps multi-byte characters split across chunks intact.
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    emitted = False
     stream = resp.get("completion") or resp.get("responseStream")
     if stream is not None:
         for event in stream:
-            chunk = event.get("chunk") or event.get("bytes") or event.get("completion")
-            if chunk:
-                text = chunk.get("text") if isinstance(chunk, dict) else None
-                if text:
-                    out.append(text)
-                else:
-                    b = chunk.get("bytes") if isinstance(chunk, dict) else None
-                    if b:
-                        try:
-                            out.append(b.decode("utf-8", errors="ignore"))
-                        except Exception:
-                            pass
-    if not out:
-        msg = resp.get("output") or resp.get("response") or {}
-        if isinstance(msg, dict):
-            # Try common shapes
-            content = msg.get("message", {}).get("content")
-            if isinstance(content, list):
-                texts = [c.get("text") for c in content if isinstance(c, dict) and c.get("text")]
-                out.extend(texts)
-        if not out:
-            return json.dumps(resp)
-    return "\n".join(out).strip()
+            chunk = event.get("chunk")
+            if chunk is None:
+                continue
+            b = chunk.get("bytes")
+            if b:
+                text = decoder.decode(b)
+            else:
+                # Rare text-only chunk: flush pending bytes first to keep order.
+                text = decoder.decode(b"", final=True) + (chunk.get("text") or "")
+            if text:
+                emitted = True
+                yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        emitted = True
+        yield tail
+    if emitted:
+        return
+
+    texts = []
+    msg = resp.get("output") or resp.get("response") or {}
+    if isinstance(msg, dict):
+        # Try common shapes
+        content = msg.get("message", {}).get("content")
+        if isinstance(content, list):
+            texts = [c.get("text") for c in content if isinstance(c, dict) and c.get("text")]
+    yield "\n".join(texts) if texts else json.dumps(resp)
+
+
+def invoke_agent_text(
+    agent_id: str,
+    agent_alias_id: str,
+    input_text: str,
+    session_id: Optional[str] = None,
+    region: Optional[str] = None,
+) -> str:
+    # Stream chunks are partial deltas of one answer; write them back to back, no separators.
+    buf = io.StringIO()
+    for text in iter_agent_text(agent_id, agent_alias_id, input_text, session_id, region):
+        buf.write(text)
+    return buf.getvalue().strip()
@@ -1,5 +1,5 @@
-from typing import List, Optional, Literal
-from pydantic import BaseModel, Field
+from typing import List, Optional, Literal, get_args
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class PresignRequest(BaseModel):
@@ -17,10 +17,16 @@ class AnalyzeRequest(BaseModel):
     s3_key: str
 
 
+Severity = Literal["low", "medium", "high", "critical"]
+SEVERITIES = get_args(Severity)
+
+
 class Issue(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     issue_id: str
     category: str
-    severity: Literal["low", "medium", "high", "critical"]
+    severity: Severity
     risk_summary: str
     recommendation: str
     exact_text_snippet: Optional[str] = None
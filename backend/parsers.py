@@ -1,40 +1,122 @@
 import os
-from typing import List, Tuple
+import threading
+from typing import BinaryIO, Iterator, List, Tuple, Union
 
-from pypdf import PdfReader
 from docx import Document
+from docx.oxml.ns import qn
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # pragma: no cover - fall back to the pure-Python reader
+    pdfium = None
+    from pypdf import PdfReader
+
+
+# PDFium is not thread-safe even across separate documents; every call into it holds this.
+_PDFIUM_LOCK = threading.Lock()
+
+# Parsers accept a filesystem path or a binary file-like object (e.g. io.BytesIO).
+Source = Union[str, BinaryIO]
+
+
+_EXTS = {".pdf": "pdf", ".docx": "docx"}
 
 
 def detect_type_from_key(key: str) -> str:
-    ext = os.path.splitext(key.lower())[-1].lstrip(".")
-    if ext in ("pdf", "docx"):
-        return ext
-    raise ValueError(f"Unsupported file type: {ext}")
+    k = key.lower()
+    for ext, name in _EXTS.items():
+        if k.endswith(ext):
+            return name
+    raise ValueError(f"Unsupported file type: {os.path.splitext(k)[-1].lstrip('.')}")
 
 
-def parse_pdf(path: str, max_pages: int = 20) -> Tuple[List[str], int]:
-    reader = PdfReader(path)
-    pages = []
-    total_pages = len(reader.pages)
-    limit = min(total_pages, max_pages)
+def _safe_extract(extract, *args, **kwargs) -> str:
+    # A page that fails to extract becomes empty text instead of failing the document.
+    try:
+        return extract(*args, **kwargs) or ""
+    except Exception:
+        return ""
+
+
+def _pdfium_page_text(pdf, index: int) -> str:
+    page = pdf[index]
+    try:
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range().replace("\r\n", "\n")
+        finally:
+            textpage.close()
+    finally:
+        page.close()
+
+
+def _pdfium_pages(pdf, max_pages: int) -> Iterator[str]:
+    # Serial on purpose: parse_pdf holds _PDFIUM_LOCK, so PDFium calls are serialized
+    # process-wide and a thread pool could not overlap pages; Lambda lacks process pools too.
+    for i in range(min(len(pdf), max_pages)):
+        yield _safe_extract(_pdfium_page_text, pdf, i)
+
+
+def _pypdf_pages(reader, max_pages: int) -> Iterator[str]:
+    pages_obj = reader.pages
+    limit = min(len(pages_obj), max_pages)
     for i in range(limit):
+        yield _safe_extract(pages_obj[i].extract_text)
+
+
+def parse_pdf(path: Source, max_pages: int = 20) -> Tuple[List[str], int]:
+    if pdfium is None:
+        reader = PdfReader(path)
+        return list(_pypdf_pages(reader, max_pages)), len(reader.pages)
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(path)
         try:
-            text = reader.pages[i].extract_text() or ""
-        except Exception:
-            text = ""
-        pages.append(text)
-    return pages, total_pages
+            return list(_pdfium_pages(pdf, max_pages)), len(pdf)
+        finally:
+            pdf.close()
+
 
+_W_P = qn("w:p")
+_W_R = qn("w:r")
+_W_HYPERLINK = qn("w:hyperlink")
+_W_T = qn("w:t")
+_W_NO_BREAK_HYPHEN = qn("w:noBreakHyphen")
+_W_BR = qn("w:br")
+_W_TYPE = qn("w:type")
+# Run children python-docx renders as whitespace; all of them separate words.
+_W_SPACES = {qn("w:tab"), qn("w:ptab"), qn("w:cr")}
 
-def parse_docx(path: str, max_pages: int = 20) -> Tuple[List[str], int]:
+
+def _docx_words(body) -> List[str]:
+    """Split body paragraphs into words by walking the run XML directly.
+
+    Same text as python-docx's Paragraph.text (runs and hyperlinks of top-level
+    paragraphs) without building a proxy object per paragraph and run.
+    """
+    words: List[str] = []
+    for p in body.iterchildren(_W_P):
+        parts = []
+        for r in p.iterchildren(_W_R, _W_HYPERLINK):
+            runs = r.iterchildren(_W_R) if r.tag == _W_HYPERLINK else (r,)
+            for run in runs:
+                for e in run:
+                    if e.tag == _W_T:
+                        parts.append(e.text or "")
+                    elif e.tag in _W_SPACES:
+                        parts.append(" ")
+                    elif e.tag == _W_BR:
+                        # Like python-docx: only line breaks are text; page/column breaks are "".
+                        if e.get(_W_TYPE, "textWrapping") == "textWrapping":
+                            parts.append(" ")
+                    elif e.tag == _W_NO_BREAK_HYPHEN:
+                        parts.append("-")
+        words.extend("".join(parts).split())
+    return words
+
+
+def parse_docx(path: Source, max_pages: int = 20) -> Tuple[List[str], int]:
     doc = Document(path)
-    texts = []
-    for p in doc.paragraphs:
-        txt = (p.text or "").strip()
-        if txt:
-            texts.append(txt)
-    content = "\n".join(texts)
-    words = content.split()
+    words = _docx_words(doc.element.body)
     chunk_size = 1200
     pages = []
     for i in range(0, len(words), chunk_size):
@@ -42,6 +124,5 @@ def parse_docx(path: str, max_pages: int = 20) -> Tuple[List[str], int]:
         if len(pages) >= max_pages:
             break
     if not pages:
-        pages = [content]
+        pages = [""]
     return pages, len(pages)
-
@@ -0,0 +1,60 @@
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Mapping, Tuple
+
+
+_NORMS: Dict[str, Tuple[str, ...]] = {
+    "confidentiality": (
+        "Exclude information already known/independently developed/public domain.",
+        "Prefer mutual obligations if both parties share information.",
+        "Limit onward disclosure to need-to-know with written obligations.",
+        "Add prompt notice for compelled disclosures.",
+    ),
+    "indemnity": (
+        "Cap indemnity (e.g., fees paid or agreed INR cap).",
+        "Exclude indirect/special/consequential/punitive damages.",
+        "Define notice, defense control, and mitigation duties.",
+    ),
+    "liability": (
+        "Cap total liability; carve-out only wilful misconduct/gross negligence.",
+        "Exclude indirect/special/consequential damages; limit to direct losses.",
+    ),
+    "termination": (
+        "Allow convenience termination with reasonable notice (e.g., 30 days).",
+        "Avoid auto-renewal or require explicit opt-in renewals.",
+    ),
+    "jurisdiction": (
+        "Prefer Indian law; choose a mutually convenient venue.",
+        "Consider arbitration under the Arbitration and Conciliation Act, 1996.",
+    ),
+    "payment": (
+        "Define payment schedule, GST handling, and late fees.",
+        "Include set-off rights and dispute procedures.",
+    ),
+    "ip": (
+        "Clarify ownership, license scope, and residuals.",
+        "Avoid implied assignments; require written assignment if needed.",
+    ),
+    "dispute-resolution": (
+        "Escalation ladder; mediation; arbitration seat and venue in India.",
+        "Specify costs allocation and language.",
+    ),
+    "non-compete": (
+        "Ensure reasonable scope/time; tie to legitimate interests.",
+        "Avoid restraints that may be void under Section 27 (restraint of trade).",
+    ),
+    "general": (
+        "Ensure confidentiality survival and return/destroy obligations.",
+        "Consider data protection compliance as applicable.",
+    ),
+}
+
+# Read-only view shared by the FastAPI analyzer and the Bedrock Agent action group Lambda.
+NORMS: Mapping[str, Tuple[str, ...]] = MappingProxyType(_NORMS)
+
+
+@lru_cache(maxsize=32)
+def policy_bullets(category: str) -> str:
+    """Return the tips for `category` (falling back to general) as a bullet list."""
+    tips = NORMS.get(category, NORMS["general"])
+    return "- " + "\n- ".join(tips)